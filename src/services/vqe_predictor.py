@@ -2,6 +2,7 @@
 
 import time
 import numpy as np
+from functools import lru_cache
 from typing import List, Dict, Tuple
 from dataclasses import dataclass
 
@@ -64,6 +65,44 @@ class VQEPredictionResponse:
     fallback_used: bool
 
 
+@lru_cache(maxsize=128)
+def _classical_trend_fit(data: Tuple[float, ...]) -> Tuple[float, float, float, str]:
+    """
+    Fit a linear trend to historical frequencies and extrapolate one step.
+
+    Pure function of the data, so results are memoized; callers build a
+    fresh PredictionResult from the returned values each time.
+
+    Returns:
+        Importance, confidence bounds (all 0-1) and trend label
+    """
+    # Simple linear trend prediction
+    x = np.arange(len(data))
+    y = np.array(data)
+
+    # Linear regression
+    slope, intercept = np.polyfit(x, y, 1)
+
+    # Predict next value
+    next_x = len(data)
+    predicted_value = slope * next_x + intercept
+
+    # Normalize to 0-1 range (assuming max frequency is 100)
+    importance = min(1.0, max(0.0, predicted_value / 100.0))
+
+    # Calculate confidence interval
+    residuals = y - (slope * x + intercept)
+    std_error = np.std(residuals, ddof=2)
+    margin = 1.96 * std_error  # 95% confidence
+    confidence_lower = max(0.0, (predicted_value - margin) / 100.0)
+    confidence_upper = min(1.0, (predicted_value + margin) / 100.0)
+
+    # Determine trend
+    trend = "increasing" if slope > 0 else "decreasing" if slope < 0 else "stable"
+
+    return importance, confidence_lower, confidence_upper, trend
+
+
 class VQEPredictor:
     """Main VQE prediction service."""
 
@@ -275,29 +314,10 @@ class VQEPredictor:
         if len(data) < 2:
             raise ValueError("Need at least 2 data points for classical prediction")
 
-        # Simple linear trend prediction
-        x = np.arange(len(data))
-        y = np.array(data)
-
-        # Linear regression
-        slope, intercept = np.polyfit(x, y, 1)
-
-        # Predict next value
-        next_x = len(data)
-        predicted_value = slope * next_x + intercept
-
-        # Normalize to 0-1 range (assuming max frequency is 100)
-        importance = min(1.0, max(0.0, predicted_value / 100.0))
-
-        # Calculate confidence interval
-        residuals = y - (slope * x + intercept)
-        std_error = np.std(residuals, ddof=2)
-        margin = 1.96 * std_error  # 95% confidence
-        confidence_lower = max(0.0, (predicted_value - margin) / 100.0)
-        confidence_upper = min(1.0, (predicted_value + margin) / 100.0)
-
-        # Determine trend
-        trend = "increasing" if slope > 0 else "decreasing" if slope < 0 else "stable"
+        # Identical histories are fitted once; the tuple is the cache key
+        importance, confidence_lower, confidence_upper, trend = _classical_trend_fit(
+            tuple(data)
+        )
 
         return PredictionResult(
             topic=topic,
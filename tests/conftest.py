@@ -0,0 +1,60 @@
+"""Shared pytest fixtures for the VQE prediction test suite."""
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+
+
+class StubPredictor:
+    """Lightweight stand-in for VQEPredictor in API tests.
+
+    ``predict_topics`` returns ``next_response`` unless ``side_effect`` is
+    set, in which case it is raised (exceptions) or called (callables).
+    ``calls`` counts how many times the API dispatched to the predictor.
+    """
+
+    quantum_available = True
+
+    def __init__(self):
+        self.next_response = None
+        self.side_effect = None
+        self.calls = 0
+
+    def predict_topics(self, request):
+        self.calls += 1
+        if isinstance(self.side_effect, BaseException):
+            raise self.side_effect
+        if self.side_effect is not None:
+            return self.side_effect(request)
+        return self.next_response
+
+
+@pytest.fixture
+def stub_predictor():
+    """Provide a fresh StubPredictor for each test."""
+    return StubPredictor()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Provide one TestClient per session (one per xdist worker)."""
+    # Imported lazily so unit tests don't pay for building the API app
+    from src.api.main import app
+
+    # Entered as a context manager so the app's lifespan runs once per
+    # session instead of lazily on some test's first request
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest_asyncio.fixture
+async def async_client():
+    """Provide an httpx AsyncClient that talks to the app over ASGI."""
+    from src.api.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://testserver"
+    ) as test_client:
+        yield test_client
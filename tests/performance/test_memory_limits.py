@@ -1,114 +1,162 @@
 """Performance tests for memory usage limits."""
 
+import asyncio
+import gc
+import orjson
 import pytest
 import time
 import psutil
 import os
-from unittest.mock import patch, MagicMock
-from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
 
-from src.api.main import app
-from src.services.vqe_predictor import VQEPredictor
 from src.services.data_loader import DataLoader
 
 
-class TestMemoryLimits:
-    """Performance tests for memory usage limits."""
+_JSON_HEADERS = {"content-type": "application/json"}
 
-    def setup_method(self):
-        """Set up test client and mock services."""
-        self.client = TestClient(app)
-        self.mock_predictor = MagicMock(spec=VQEPredictor)
-        self.mock_data_loader = MagicMock(spec=DataLoader)
 
-        # Mock quantum as available
-        self.mock_predictor.quantum_available = True
+@pytest.fixture(scope="session")
+def proc():
+    """Provide one psutil handle on this process for RSS sampling."""
+    return psutil.Process(os.getpid())
 
-        # Patch the services in the API
-        with patch('src.api.main.predictor', self.mock_predictor), \
-             patch('src.api.main.data_loader', self.mock_data_loader):
-            pass
 
-    def test_memory_usage_baseline(self):
-        """Test baseline memory usage for predictions."""
-        # Mock response with memory tracking
-        mock_response = {
-            "predictions": [{
-                "topic": "memory-baseline",
-                "importance": 0.25,
-                "confidence_interval": [0.20, 0.30],
-                "trend": "stable",
-                "method": "quantum"
-            }],
-            "execution_time_ms": 1500,
-            "memory_usage_mb": 128,  # Baseline memory usage
-            "fallback_used": False
-        }
+def rss_mb(p):
+    """Return the resident set size of process ``p`` in whole MB."""
+    return p.memory_info().rss >> 20
 
-        self.mock_predictor.predict_topics.return_value = mock_response
 
-        request_data = {"topics": ["memory-baseline"]}
+def _quantum_prediction(topic, t):
+    """Build the ``t``-th quantum prediction; importance cycles over 5 levels."""
+    step = (t % 5) * 0.1
+    return {
+        "topic": topic,
+        "importance": 0.1 + step,
+        "confidence_interval": [0.05 + step, 0.15 + step],
+        "trend": "stable",
+        "method": "quantum"
+    }
 
-        # Get initial memory usage
-        process = psutil.Process(os.getpid())
-        initial_memory = process.memory_info().rss / 1024 / 1024  # MB
 
-        response = self.client.post("/api/v1/predict", json=request_data)
+@pytest.fixture
+def frozen_heap():
+    """Collect garbage and freeze the heap so RSS readings start stable."""
+    gc.collect()
+    # Long-lived objects built so far are moved out of the GC's reach
+    gc.freeze()
+    yield
+    gc.unfreeze()
 
-        # Get memory usage after request
-        final_memory = process.memory_info().rss / 1024 / 1024  # MB
 
-        assert response.status_code == 200
-        data = response.json()
+@pytest.fixture(autouse=True)
+def mock_predictor(monkeypatch: pytest.MonkeyPatch, stub_predictor):
+    """Patch the API with a stub predictor and a mock data loader per test."""
+    predictor = stub_predictor
 
-        # Verify memory usage is tracked
-        assert "memory_usage_mb" in data
-        assert data["memory_usage_mb"] > 0
-        assert data["memory_usage_mb"] < 512  # Should be less than 512MB
+    # Mock quantum as available
+    predictor.quantum_available = True
 
-        # Verify process memory didn't grow excessively
-        memory_growth = final_memory - initial_memory
-        assert memory_growth < 100  # Less than 100MB growth
+    # monkeypatch keeps the mocks live for the whole test, then restores them
+    monkeypatch.setattr("src.api.main.predictor", predictor)
+    monkeypatch.setattr("src.api.main.data_loader", MagicMock(spec=DataLoader))
+    return predictor
 
-    def test_memory_scaling_with_problem_size(self):
-        """Test how memory usage scales with problem size."""
-        # Test different problem sizes
-        test_cases = [
-            {"topics": ["small"], "expected_max_memory": 256},
-            {"topics": ["small", "medium"], "expected_max_memory": 384},
-            {"topics": ["small", "medium", "large"], "expected_max_memory": 512}
+
+class TestMemoryLimits:
+    """Performance tests for memory usage limits."""
+
+    @pytest.mark.usefixtures("frozen_heap")
+    @pytest.mark.parametrize(
+        "n_requests,n_topics,max_growth_mb",
+        [(1, 1, 100), (5, 1, 50), (20, 1, 10), (1, 20, 150)],
+        ids=["baseline", "cleanup", "leak", "large_dataset"],
+    )
+    def test_memory_growth(
+        self, client, mock_predictor, proc, n_requests, n_topics, max_growth_mb
+    ):
+        """Test that process memory stays bounded across repeated predictions."""
+        # Topic names are built up front and shared by mock and request
+        request_topics = [
+            [f"memory-test-{r}-{t}" for t in range(n_topics)]
+            for r in range(n_requests)
         ]
 
-        for i, test_case in enumerate(test_cases):
-            mock_response = {
+        initial_memory = rss_mb(proc)
+
+        for topics in request_topics:
+            # Each request gets its own response, as a real predictor would
+            # return, so no payload the stub already holds is edited in place
+            mock_predictor.next_response = {
                 "predictions": [
-                    {
-                        "topic": topic,
-                        "importance": 0.2 + j * 0.1,
-                        "confidence_interval": [0.15 + j * 0.1, 0.25 + j * 0.1],
-                        "trend": "stable",
-                        "method": "quantum"
-                    } for j, topic in enumerate(test_case["topics"])
+                    _quantum_prediction(topic, t) for t, topic in enumerate(topics)
                 ],
-                "execution_time_ms": 1000 + i * 500,
-                "memory_usage_mb": 100 + i * 50,  # Increasing memory
+                "execution_time_ms": 1000,
+                "memory_usage_mb": 128,
                 "fallback_used": False
             }
 
-            self.mock_predictor.predict_topics.return_value = mock_response
-
-            request_data = {"topics": test_case["topics"]}
-
-            response = self.client.post("/api/v1/predict", json=request_data)
+            payload = orjson.dumps({"topics": topics})
+            response = client.post(
+                "/api/v1/predict", content=payload, headers=_JSON_HEADERS
+            )
 
             assert response.status_code == 200
-            data = response.json()
+            data = orjson.loads(response.content)
 
-            # Verify memory usage scales reasonably
-            assert data["memory_usage_mb"] <= test_case["expected_max_memory"]
+            # Verify memory usage is tracked and every topic came back
+            assert len(data["predictions"]) == n_topics
             assert data["memory_usage_mb"] > 0
+            assert data["memory_usage_mb"] < 512  # Should be less than 512MB
+
+        # Read memory usage once transient cyclic garbage is gone
+        gc.collect()
+        final_memory = rss_mb(proc)
+
+        # Process memory should not grow excessively
+        total_growth = final_memory - initial_memory
+        assert total_growth < max_growth_mb
+
+    @pytest.mark.parametrize(
+        "topics,memory_usage_mb,expected_max_memory",
+        [
+            (["small"], 100, 256),
+            (["small", "medium"], 150, 384),
+            (["small", "medium", "large"], 200, 512),
+        ],
+    )
+    def test_memory_scaling_with_problem_size(
+        self, client, mock_predictor, topics, memory_usage_mb, expected_max_memory
+    ):
+        """Test how memory usage scales with problem size."""
+        mock_response = {
+            "predictions": [
+                {
+                    "topic": topic,
+                    "importance": 0.2 + j * 0.1,
+                    "confidence_interval": [0.15 + j * 0.1, 0.25 + j * 0.1],
+                    "trend": "stable",
+                    "method": "quantum"
+                } for j, topic in enumerate(topics)
+            ],
+            "execution_time_ms": 1000 + (len(topics) - 1) * 500,
+            "memory_usage_mb": memory_usage_mb,  # Increasing memory
+            "fallback_used": False
+        }
+
+        mock_predictor.next_response = mock_response
+
+        request_data = {"topics": topics}
+
+        response = client.post("/api/v1/predict", json=request_data)
+
+        assert response.status_code == 200
+        data = orjson.loads(response.content)
+
+        # Verify memory usage scales reasonably
+        assert data["memory_usage_mb"] <= expected_max_memory
+        assert data["memory_usage_mb"] > 0
 
-    def test_memory_limits_enforcement(self):
+    def test_memory_limits_enforcement(self, client, mock_predictor):
         """Test that memory limits are enforced."""
         # Mock excessive memory usage
         mock_response = {
@@ -125,58 +173,21 @@ class TestMemoryLimits:
             "fallback_used": False
         }
 
-        self.mock_predictor.predict_topics.return_value = mock_response
+        mock_predictor.next_response = mock_response
 
         request_data = {"topics": ["memory-limit-test"]}
 
-        response = self.client.post("/api/v1/predict", json=request_data)
+        response = client.post("/api/v1/predict", json=request_data)
 
         assert response.status_code == 200
-        data = response.json()
+        data = orjson.loads(response.content)
 
         # Should detect memory limit exceeded
         assert data["memory_usage_mb"] >= 1024  # At least 1GB
         assert data.get("memory_limit_exceeded", False) is True
 
-    def test_memory_cleanup_after_requests(self):
-        """Test that memory is properly cleaned up after requests."""
-        process = psutil.Process(os.getpid())
-
-        # Make multiple requests
-        initial_memory = process.memory_info().rss / 1024 / 1024
-
-        for i in range(5):
-            mock_response = {
-                "predictions": [{
-                    "topic": f"cleanup-test-{i}",
-                    "importance": 0.25,
-                    "confidence_interval": [0.20, 0.30],
-                    "trend": "stable",
-                    "method": "quantum"
-                }],
-                "execution_time_ms": 1200,
-                "memory_usage_mb": 150,
-                "fallback_used": False
-            }
-
-            self.mock_predictor.predict_topics.return_value = mock_response
-
-            request_data = {"topics": [f"cleanup-test-{i}"]}
-            response = self.client.post("/api/v1/predict", json=request_data)
-
-            assert response.status_code == 200
-
-        # Check memory after all requests
-        final_memory = process.memory_info().rss / 1024 / 1024
-        memory_growth = final_memory - initial_memory
-
-        # Memory growth should be reasonable (less than 50MB total)
-        assert memory_growth < 50
-
-    def test_memory_usage_with_different_methods(self):
+    def test_memory_usage_with_different_methods(self, client, mock_predictor):
         """Test memory usage comparison between quantum and classical methods."""
-        process = psutil.Process(os.getpid())
-
         # Test quantum method
         quantum_response = {
             "predictions": [{
@@ -191,13 +202,13 @@ class TestMemoryLimits:
             "fallback_used": False
         }
 
-        self.mock_predictor.predict_topics.return_value = quantum_response
+        mock_predictor.next_response = quantum_response
 
         quantum_request = {"topics": ["method-comparison"], "force_classical": False}
-        response = self.client.post("/api/v1/predict", json=quantum_request)
+        response = client.post("/api/v1/predict", json=quantum_request)
 
         assert response.status_code == 200
-        quantum_data = response.json()
+        quantum_data = orjson.loads(response.content)
         quantum_memory = quantum_data["memory_usage_mb"]
 
         # Test classical method
@@ -214,13 +225,13 @@ class TestMemoryLimits:
             "fallback_used": False
         }
 
-        self.mock_predictor.predict_topics.return_value = classical_response
+        mock_predictor.next_response = classical_response
 
         classical_request = {"topics": ["method-comparison"], "force_classical": True}
-        response = self.client.post("/api/v1/predict", json=classical_request)
+        response = client.post("/api/v1/predict", json=classical_request)
 
         assert response.status_code == 200
-        classical_data = response.json()
+        classical_data = orjson.loads(response.content)
         classical_memory = classical_data["memory_usage_mb"]
 
         # Classical should use less memory than quantum
@@ -228,13 +239,16 @@ class TestMemoryLimits:
         assert classical_memory > 0
         assert quantum_memory > 0
 
-    def test_memory_usage_under_concurrent_load(self):
-        """Test memory usage under concurrent load."""
-        import threading
-        import queue
+    @pytest.mark.asyncio
+    async def test_memory_usage_under_concurrent_load(
+        self, async_client, mock_predictor, proc
+    ):
+        """Test memory usage when several requests are gathered at once.
 
-        process = psutil.Process(os.getpid())
-        initial_memory = process.memory_info().rss / 1024 / 1024
+        The predict endpoint never awaits, so the gathered posts actually run
+        one after another; only the total RSS growth is checked.
+        """
+        initial_memory = rss_mb(proc)
 
         # Mock response for concurrent calls
         mock_response = {
@@ -250,175 +264,63 @@ class TestMemoryLimits:
             "fallback_used": False
         }
 
-        self.mock_predictor.predict_topics.return_value = mock_response
-
-        request_data = {"topics": ["concurrent-memory-test"]}
+        mock_predictor.next_response = mock_response
 
-        # Function to make API calls and track memory
-        def make_request_with_memory(result_queue):
-            try:
-                thread_memory_start = process.memory_info().rss / 1024 / 1024
-                response = self.client.post("/api/v1/predict", json=request_data)
-                thread_memory_end = process.memory_info().rss / 1024 / 1024
+        # Encoded once; bytes are immutable, so every request shares them
+        payload = orjson.dumps({"topics": ["concurrent-memory-test"]})
 
-                result_queue.put({
-                    "status": response.status_code,
-                    "data": response.json() if response.status_code == 200 else None,
-                    "memory_growth": thread_memory_end - thread_memory_start
-                })
-            except Exception as e:
-                result_queue.put({"error": str(e)})
-
-        # Make concurrent requests
+        # Gather the requests
         num_concurrent = 3
-        result_queue = queue.Queue()
-        threads = []
-
-        # Start concurrent requests
-        for _ in range(num_concurrent):
-            thread = threading.Thread(target=make_request_with_memory, args=(result_queue,))
-            threads.append(thread)
-            thread.start()
-
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
-
-        final_memory = process.memory_info().rss / 1024 / 1024
+        responses = await asyncio.gather(*[
+            async_client.post(
+                "/api/v1/predict", content=payload, headers=_JSON_HEADERS
+            )
+            for _ in range(num_concurrent)
+        ])
+
+        final_memory = rss_mb(proc)
         total_memory_growth = final_memory - initial_memory
 
-        # Collect results
-        results = []
-        while not result_queue.empty():
-            results.append(result_queue.get())
-
         # Verify all requests succeeded
-        assert len(results) == num_concurrent
-        for result in results:
-            assert "status" in result
-            assert result["status"] == 200
-            assert result["data"] is not None
-            assert result["memory_growth"] >= 0
+        assert len(responses) == num_concurrent
+        for response in responses:
+            assert response.status_code == 200
+            data = orjson.loads(response.content)
+            assert data["predictions"][0]["topic"] == "concurrent-memory-test"
 
         # Total memory growth should be reasonable
         assert total_memory_growth < 200  # Less than 200MB total growth
 
-    def test_memory_leak_detection(self):
-        """Test detection of memory leaks over multiple requests."""
-        process = psutil.Process(os.getpid())
-
-        # Make many requests to detect potential memory leaks
-        memory_readings = []
-
-        for i in range(20):
-            mock_response = {
-                "predictions": [{
-                    "topic": f"leak-test-{i}",
-                    "importance": 0.25,
-                    "confidence_interval": [0.20, 0.30],
-                    "trend": "stable",
-                    "method": "quantum"
-                }],
-                "execution_time_ms": 1000,
-                "memory_usage_mb": 120,
-                "fallback_used": False
-            }
-
-            self.mock_predictor.predict_topics.return_value = mock_response
-
-            request_data = {"topics": [f"leak-test-{i}"]}
-            response = self.client.post("/api/v1/predict", json=request_data)
-
-            assert response.status_code == 200
-
-            # Record memory usage
-            current_memory = process.memory_info().rss / 1024 / 1024
-            memory_readings.append(current_memory)
-
-        # Check for memory leak (should not grow by more than 10MB total)
-        if len(memory_readings) > 1:
-            total_growth = memory_readings[-1] - memory_readings[0]
-            assert total_growth < 10  # Less than 10MB growth over 20 requests
-
-    def test_memory_usage_with_large_datasets(self):
-        """Test memory usage with large datasets."""
-        # Create a large dataset
-        large_topics = [f"topic_{i}" for i in range(20)]
-        predictions = []
-
-        for i, topic in enumerate(large_topics):
-            predictions.append({
-                "topic": topic,
-                "importance": 0.1 + (i % 5) * 0.1,
-                "confidence_interval": [0.05 + (i % 5) * 0.1, 0.15 + (i % 5) * 0.1],
+    @pytest.mark.parametrize(
+        "usage,threshold,should_warn",
+        [(128, 256, False), (300, 256, True), (600, 512, True)],
+    )
+    def test_memory_threshold_monitoring(
+        self, client, mock_predictor, usage, threshold, should_warn
+    ):
+        """Test monitoring of memory usage against thresholds."""
+        mock_response = {
+            "predictions": [{
+                "topic": f"threshold-test-{usage}",
+                "importance": 0.25,
+                "confidence_interval": [0.20, 0.30],
                 "trend": "stable",
                 "method": "quantum"
-            })
-
-        mock_response = {
-            "predictions": predictions,
-            "execution_time_ms": 5000,
-            "memory_usage_mb": 384,  # Moderate memory usage
+            }],
+            "execution_time_ms": 1500,
+            "memory_usage_mb": usage,
+            "memory_threshold_exceeded": usage > threshold,
             "fallback_used": False
         }
 
-        self.mock_predictor.predict_topics.return_value = mock_response
+        mock_predictor.next_response = mock_response
 
-        request_data = {"topics": large_topics}
+        request_data = {"topics": [f"threshold-test-{usage}"]}
 
-        process = psutil.Process(os.getpid())
-        initial_memory = process.memory_info().rss / 1024 / 1024
-
-        response = self.client.post("/api/v1/predict", json=request_data)
-
-        final_memory = process.memory_info().rss / 1024 / 1024
+        response = client.post("/api/v1/predict", json=request_data)
 
         assert response.status_code == 200
-        data = response.json()
-
-        # Should handle large dataset
-        assert len(data["predictions"]) == 20
-        assert data["memory_usage_mb"] < 1024  # Less than 1GB
-
-        # Process memory growth should be reasonable
-        memory_growth = final_memory - initial_memory
-        assert memory_growth < 150  # Less than 150MB growth
-
-    def test_memory_threshold_monitoring(self):
-        """Test monitoring of memory usage against thresholds."""
-        # Test different memory usage scenarios
-        memory_scenarios = [
-            {"usage": 128, "threshold": 256, "should_warn": False},
-            {"usage": 300, "threshold": 256, "should_warn": True},
-            {"usage": 600, "threshold": 512, "should_warn": True}
-        ]
-
-        for scenario in memory_scenarios:
-            mock_response = {
-                "predictions": [{
-                    "topic": f"threshold-test-{scenario['usage']}",
-                    "importance": 0.25,
-                    "confidence_interval": [0.20, 0.30],
-                    "trend": "stable",
-                    "method": "quantum"
-                }],
-                "execution_time_ms": 1500,
-                "memory_usage_mb": scenario["usage"],
-                "memory_threshold_exceeded": scenario["usage"] > scenario["threshold"],
-                "fallback_used": False
-            }
-
-            self.mock_predictor.predict_topics.return_value = mock_response
-
-            request_data = {"topics": [f"threshold-test-{scenario['usage']}"]}
-
-            response = self.client.post("/api/v1/predict", json=request_data)
-
-            assert response.status_code == 200
-            data = response.json()
+        data = orjson.loads(response.content)
 
-            # Verify threshold monitoring
-            if scenario["should_warn"]:
-                assert data.get("memory_threshold_exceeded", False) is True
-            else:
-                assert data.get("memory_threshold_exceeded", False) is False
+        # Verify threshold monitoring
+        assert data.get("memory_threshold_exceeded", False) is should_warn
@@ -1,120 +1,170 @@
 """Unit tests for VQE predictor service."""
 
+import dataclasses
+import typing
+
+import numpy as np
 import pytest
-from unittest.mock import patch
 
 from src.services.vqe_predictor import (
+    QISKIT_AVAILABLE,
     VQEPredictor,
     PredictionRequest,
     PredictionResult,
     VQEPredictionResponse,
+    _classical_trend_fit,
+)
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    """Provide one VQEPredictor shared by the tests in this module."""
+    return VQEPredictor()
+
+
+# Historical frequencies, one row per topic. Kept float64 so the
+# predictor's outputs stay Python-float compatible.
+_TOPICS = ("quantum-mechanics", "linear-algebra")
+_SAMPLE_MATRIX = np.array(
+    [
+        [15.0, 18.0, 22.0, 25.0, 28.0],
+        [20.0, 19.0, 21.0, 20.0, 22.0],
+    ]
 )
+_SAMPLE_MATRIX.flags.writeable = False
+
+# Runtime class of each PredictionResult field (Tuple[float, float] -> tuple)
+_RESULT_TYPES = {
+    field.name: typing.get_origin(field.type) or field.type
+    for field in dataclasses.fields(PredictionResult)
+}
+
+# Requests are built once; predict_topics only reads them.
+# _REQ_ALL batches every sample topic plus one unknown topic in one call.
+_MISSING_TOPIC = "non-existent-topic"
+_REQ_ALL = PredictionRequest(topics=[*_TOPICS, _MISSING_TOPIC], force_classical=True)
+_REQ_MISSING = PredictionRequest(topics=[_MISSING_TOPIC], force_classical=True)
+_REQ_QM_AUTO = PredictionRequest(topics=["quantum-mechanics"])
+_REQ_SPARSE = PredictionRequest(topics=["topic1", "topic2"], force_classical=True)
+
+
+@pytest.fixture(scope="module")
+def sample_data():
+    """Map each topic to its row of the sample matrix (views, not copies)."""
+    return {topic: _SAMPLE_MATRIX[i] for i, topic in enumerate(_TOPICS)}
+
+
+@pytest.fixture(scope="module")
+def batch_response(predictor, sample_data):
+    """Run one classical prediction over all topics, shared read-only."""
+    return predictor.predict_topics(_REQ_ALL, sample_data)
+
+
+@pytest.fixture(scope="module")
+def predictions_by_topic(batch_response):
+    """Index the batched predictions by topic name."""
+    return {p.topic: p for p in batch_response.predictions}
+
+
+def test_initialization(predictor):
+    """Test predictor initialization."""
+    assert predictor.max_qubits == 6
+    assert predictor.max_iterations == 100
+    assert isinstance(predictor.quantum_available, bool)
+
+
+def test_classical_prediction(batch_response, predictions_by_topic):
+    """Test classical prediction method."""
+    assert isinstance(batch_response, VQEPredictionResponse)
+    prediction = predictions_by_topic["quantum-mechanics"]
+    assert prediction.importance == pytest.approx(0.5, abs=0.5)  # in [0, 1]
+    assert prediction.method == "classical"
+    assert batch_response.execution_time_ms >= 0
+
+
+def test_multiple_topics_prediction(batch_response, predictions_by_topic):
+    """Test prediction for multiple topics."""
+    assert len(batch_response.predictions) == 2
+    assert "quantum-mechanics" in predictions_by_topic
+    assert "linear-algebra" in predictions_by_topic
+
+
+def test_insufficient_data_handling(predictor):
+    """Test handling of topics with insufficient data."""
+    insufficient_data = {
+        "topic1": [10.0],  # Only 1 data point
+        "topic2": [10.0, 12.0],  # Only 2 data points
+    }
+
+    response = predictor.predict_topics(_REQ_SPARSE, insufficient_data)
+
+    # Should handle gracefully (either skip or use available data)
+    assert isinstance(response, VQEPredictionResponse)
+
+
+def test_missing_topic_handling(
+    predictor, sample_data, batch_response, predictions_by_topic
+):
+    """Test handling of topics not in historical data."""
+    response = predictor.predict_topics(_REQ_MISSING, sample_data)
+
+    # Should skip topics not in data
+    assert response.predictions == []
+    # ...and still predict each known one exactly once when batched with them
+    assert len(batch_response.predictions) == 2
+    assert set(predictions_by_topic) == set(_TOPICS)
+
+
+@pytest.fixture
+def empty_trend_cache():
+    """Start from an empty trend-fit cache and leave it empty afterwards."""
+    _classical_trend_fit.cache_clear()
+    yield
+    _classical_trend_fit.cache_clear()
+
+
+@pytest.mark.usefixtures("empty_trend_cache")
+def test_classical_trend_fit_is_memoized(predictor):
+    """Test that ndarray rows and float lists share one cached trend fit."""
+    row = _SAMPLE_MATRIX[0]
+
+    first = predictor._classical_prediction("quantum-mechanics", row, 0.95)
+    second = predictor._classical_prediction("quantum-mechanics", row.tolist(), 0.95)
+
+    info = _classical_trend_fit.cache_info()
+    assert (info.misses, info.hits, info.currsize) == (1, 1, 1)
+    assert first == second
+
+
+def test_quantum_unavailable_fallback(monkeypatch, sample_data):
+    """Test fallback to classical when quantum is unavailable."""
+    # Without Qiskit installed the flag is already False; only flip it
+    # when there is a real quantum backend to hide
+    if QISKIT_AVAILABLE:
+        monkeypatch.setattr("src.services.vqe_predictor.QISKIT_AVAILABLE", False)
+    predictor = VQEPredictor()
+
+    response = predictor.predict_topics(_REQ_QM_AUTO, sample_data)
+
+    assert len(response.predictions) == 1
+    assert response.predictions[0].method == "classical"
+    assert response.fallback_used is True
+
+
+def test_prediction_result_structure(predictions_by_topic):
+    """Test prediction result data structure."""
+    prediction = predictions_by_topic["quantum-mechanics"]
 
+    assert isinstance(prediction, PredictionResult)
+    for name, field_type in _RESULT_TYPES.items():
+        assert isinstance(getattr(prediction, name), field_type), name
+    assert len(prediction.confidence_interval) == 2
 
-class TestVQEPredictor:
-    """Test cases for VQE predictor."""
-
-    def setup_method(self):
-        """Setup test fixtures."""
-        self.predictor = VQEPredictor()
-        self.sample_data = {
-            "quantum-mechanics": [15.0, 18.0, 22.0, 25.0, 28.0],
-            "linear-algebra": [20.0, 19.0, 21.0, 20.0, 22.0],
-        }
-
-    def test_initialization(self):
-        """Test predictor initialization."""
-        assert self.predictor.max_qubits == 6
-        assert self.predictor.max_iterations == 100
-        assert isinstance(self.predictor.quantum_available, bool)
-
-    def test_classical_prediction(self):
-        """Test classical prediction method."""
-        request = PredictionRequest(topics=["quantum-mechanics"], force_classical=True)
-
-        response = self.predictor.predict_topics(request, self.sample_data)
-
-        assert isinstance(response, VQEPredictionResponse)
-        assert len(response.predictions) == 1
-        assert response.predictions[0].topic == "quantum-mechanics"
-        assert 0.0 <= response.predictions[0].importance <= 1.0
-        assert response.predictions[0].method == "classical"
-        assert response.execution_time_ms >= 0
-
-    def test_multiple_topics_prediction(self):
-        """Test prediction for multiple topics."""
-        request = PredictionRequest(
-            topics=["quantum-mechanics", "linear-algebra"], force_classical=True
-        )
-
-        response = self.predictor.predict_topics(request, self.sample_data)
-
-        assert len(response.predictions) == 2
-        topic_names = [p.topic for p in response.predictions]
-        assert "quantum-mechanics" in topic_names
-        assert "linear-algebra" in topic_names
-
-    def test_insufficient_data_handling(self):
-        """Test handling of topics with insufficient data."""
-        insufficient_data = {
-            "topic1": [10.0],  # Only 1 data point
-            "topic2": [10.0, 12.0],  # Only 2 data points
-        }
-
-        request = PredictionRequest(topics=["topic1", "topic2"], force_classical=True)
-
-        response = self.predictor.predict_topics(request, insufficient_data)
-
-        # Should handle gracefully (either skip or use available data)
-        assert isinstance(response, VQEPredictionResponse)
-
-    def test_missing_topic_handling(self):
-        """Test handling of topics not in historical data."""
-        request = PredictionRequest(topics=["non-existent-topic"], force_classical=True)
-
-        response = self.predictor.predict_topics(request, self.sample_data)
-
-        # Should skip topics not in data
-        assert len(response.predictions) == 0
-
-    @patch("src.services.vqe_predictor.QISKIT_AVAILABLE", False)
-    def test_quantum_unavailable_fallback(self):
-        """Test fallback to classical when quantum is unavailable."""
-        with patch("src.services.vqe_predictor.QISKIT_AVAILABLE", False):
-            predictor = VQEPredictor()
-            request = PredictionRequest(topics=["quantum-mechanics"])
-
-            response = predictor.predict_topics(request, self.sample_data)
-
-            assert len(response.predictions) == 1
-            assert response.predictions[0].method == "classical"
-            assert response.fallback_used is True
-
-    def test_prediction_result_structure(self):
-        """Test prediction result data structure."""
-        request = PredictionRequest(topics=["quantum-mechanics"], force_classical=True)
-
-        response = self.predictor.predict_topics(request, self.sample_data)
-        prediction = response.predictions[0]
-
-        assert isinstance(prediction, PredictionResult)
-        assert isinstance(prediction.topic, str)
-        assert isinstance(prediction.importance, float)
-        assert isinstance(prediction.confidence_interval, tuple)
-        assert len(prediction.confidence_interval) == 2
-        assert isinstance(prediction.trend, str)
-        assert isinstance(prediction.method, str)
-
-        # Validate value ranges
-        assert 0.0 <= prediction.importance <= 1.0
-        assert 0.0 <= prediction.confidence_interval[0] <= 1.0
-        assert 0.0 <= prediction.confidence_interval[1] <= 1.0
-        assert (
-            prediction.confidence_interval[0]
-            <= prediction.importance
-            <= prediction.confidence_interval[1]
-        )
-
-
-if __name__ == "__main__":
-    pytest.main([__file__])
+    # Validate value ranges: score and both bounds lie in [0, 1]
+    values = np.array([prediction.importance, *prediction.confidence_interval])
+    assert ((values >= 0.0) & (values <= 1.0)).all(), values
+    assert (
+        prediction.confidence_interval[0]
+        <= prediction.importance
+        <= prediction.confidence_interval[1]
+    )